@@ -1,8 +1,15 @@
  # app.py
-from flask import Flask, render_template, request, jsonify, session, send_from_directory
+from flask import Flask, render_template, request, jsonify, session, send_from_directory, Response
 import sqlite3
 from scraper import NagpurCourtScraper
+from page_pool import StagedPagePool
+from browser_cache import BrowserDiskCache
+from db_maintenance import (MaintenanceTask, enable_incremental_vacuum, migrate_queries_table,
+                            export_queries)
+import json
 import logging
+import os
+import atexit
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -17,6 +24,51 @@ logger = logging.getLogger(__name__)
 # Global scraper instance (for session management)
 scrapers = {}
 
+# Number of browsers kept parked on the search page (0 disables staging)
+STAGED_PAGES = int(os.environ.get('STAGED_PAGES', '2'))
+# Seconds before a staged page is considered expired and reloaded
+STAGED_PAGE_TTL = int(os.environ.get('STAGED_PAGE_TTL', '300'))
+
+# Directory for the HTTP cache shared by all browsers (empty disables it)
+BROWSER_CACHE_DIR = os.environ.get('BROWSER_CACHE_DIR', 'browser_cache')
+# Size limit of the shared browser cache in megabytes
+BROWSER_CACHE_MAX_MB = int(os.environ.get('BROWSER_CACHE_MAX_MB', '200'))
+# Seconds between prunes of the shared browser cache
+BROWSER_CACHE_PRUNE_INTERVAL = int(os.environ.get('BROWSER_CACHE_PRUNE_INTERVAL', '600'))
+# Seconds before a pooled browser is closed and replaced, merging its cache back (0 disables)
+POOL_BROWSER_MAX_AGE = int(os.environ.get('POOL_BROWSER_MAX_AGE', '3600'))
+
+# Archive rows older than this many days (0, the default, disables)
+RETENTION_MAX_AGE_DAYS = int(os.environ.get('RETENTION_MAX_AGE_DAYS', '0'))
+# Keep only this many rows per case type/number/year (0, the default, disables)
+RETENTION_MAX_PER_CASE = int(os.environ.get('RETENTION_MAX_PER_CASE', '0'))
+# Directory for compressed NDJSON segments of archived rows
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'archive')
+# Seconds between retention and incremental vacuum runs (0 disables)
+MAINTENANCE_INTERVAL = int(os.environ.get('MAINTENANCE_INTERVAL', '3600'))
+
+# Pool of staged search pages, shared browser cache and database maintenance, set up in __main__
+page_pool = None
+browser_cache = None
+maintenance = None
+
+def new_scraper():
+    """Create a scraper that uses the shared browser cache when enabled"""
+    return NagpurCourtScraper(disk_cache=browser_cache)
+
+def acquire_scraper():
+    """Get a scraper, preferring one already staged on the search page"""
+    if page_pool:
+        return page_pool.acquire()
+    return new_scraper(), False
+
+def release_scraper(scraper, staged):
+    """Return a scraper to the pool or close it"""
+    if page_pool:
+        page_pool.release(scraper, staged)
+    else:
+        scraper.close()
+
 # Setup SQLite
 def init_db():
     conn = sqlite3.connect('database.db')
@@ -30,6 +82,8 @@ def init_db():
                     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
                 )''')
     conn.commit()
+    migrate_queries_table(conn)
+    enable_incremental_vacuum(conn)
     conn.close()
 
 @app.route('/')
@@ -40,7 +94,7 @@ def index():
 def get_captcha():
     """Fetch the latest captcha image from the court website and save it to static/captcha.png"""
     try:
-        scraper = NagpurCourtScraper()
+        scraper = new_scraper()
         scraper.driver.get(scraper.base_url)
         # Wait for page to load
         WebDriverWait(scraper.driver, 10).until(
@@ -64,15 +118,17 @@ def fetch():
     filing_year = request.form['filing_year']
     captcha_text = request.form.get('captcha_text')
 
+    scraper = None
     try:
-        # Create a new scraper instance for this request
-        scraper = NagpurCourtScraper()
-        # Navigate to the website and fill form fields
-        scraper.driver.get(scraper.base_url)
-        WebDriverWait(scraper.driver, 10).until(
-            EC.presence_of_element_located((By.ID, "est_code"))
-        )
-        scraper.fill_form_fields(case_type, case_number, filing_year)
+        # Take a staged scraper if one is ready, otherwise start from scratch
+        scraper, staged = acquire_scraper()
+        if staged:
+            # Already on the search page with the court complex selected
+            scraper.fill_case_fields(case_type, case_number, filing_year)
+        else:
+            # Navigate to the website and fill form fields
+            scraper.load_search_page(timeout=10)
+            scraper.fill_form_fields(case_type, case_number, filing_year)
         
         # Fill captcha manually
         if not scraper.fill_captcha_manual(captcha_text):
@@ -84,12 +140,13 @@ def fetch():
         
         # Extract results
         data = scraper.extract_results()
-        scraper.close()
+        release_scraper(scraper, staged)
+        scraper = None
 
         # Save to DB
         conn = sqlite3.connect('database.db')
         c = conn.cursor()
-        c.execute("INSERT INTO queries (case_type, case_number, filing_year, response) VALUES (?, ?, ?, ?)",
+        c.execute("INSERT INTO queries (case_type, case_number, filing_year, response, timestamp) VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)",
                   (case_type, case_number, filing_year, str(data)))
         conn.commit()
         conn.close()
@@ -98,6 +155,8 @@ def fetch():
 
     except Exception as e:
         logger.error(f"Error in fetch: {e}")
+        if scraper:
+            release_scraper(scraper, staged)
         return f"<h3>Error: {str(e)}</h3><p>Try again later or check your inputs.</p>"
 
 @app.route('/api/scrape', methods=['POST'])
@@ -112,10 +171,12 @@ def api_scrape():
         if not all([case_type, case_number, filing_year]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        # Create scraper and scrape
-        scraper = NagpurCourtScraper()
-        result = scraper.scrape_case_data(case_type, case_number, filing_year)
-        scraper.close()
+        # Take a staged scraper if available and scrape
+        scraper, staged = acquire_scraper()
+        try:
+            result = scraper.scrape_case_data(case_type, case_number, filing_year, staged=staged)
+        finally:
+            release_scraper(scraper, staged)
         
         return jsonify(result)
         
@@ -139,11 +200,27 @@ def history():
         logger.error(f"Error fetching history: {e}")
         return f"<h3>Error: {str(e)}</h3>"
 
+@app.route('/export')
+def export():
+    """Export all queries as NDJSON, including archived rows unless ?archive=0"""
+    include_archive = request.args.get('archive', '1') != '0'
+    rows = export_queries('database.db', ARCHIVE_DIR, include_archive=include_archive)
+    return Response((json.dumps(row) + '\n' for row in rows),
+                    mimetype='application/x-ndjson',
+                    headers={'Content-Disposition': 'attachment; filename=queries.ndjson'})
+
+@app.route('/pool_stats')
+def pool_stats():
+    """Report staged search page hit rate and age"""
+    if not page_pool:
+        return jsonify({'enabled': False})
+    return jsonify(dict(page_pool.stats(), enabled=True))
+
 @app.route('/test')
 def test_scraper():
     """Test endpoint for scraper"""
     try:
-        scraper = NagpurCourtScraper()
+        scraper = new_scraper()
         result = scraper.scrape_case_data("Criminal", "123", "2023")
         scraper.close()
         return jsonify(result)
@@ -152,4 +229,22 @@ def test_scraper():
 
 if __name__ == '__main__':
     init_db()
+    # With debug=True the reloader runs the app in a child process, only start background work there
+    if MAINTENANCE_INTERVAL > 0 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        maintenance = MaintenanceTask('database.db', ARCHIVE_DIR,
+                                      max_age_days=RETENTION_MAX_AGE_DAYS,
+                                      max_per_case=RETENTION_MAX_PER_CASE,
+                                      interval=MAINTENANCE_INTERVAL)
+        maintenance.start()
+    if BROWSER_CACHE_DIR and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        browser_cache = BrowserDiskCache(BROWSER_CACHE_DIR,
+                                         max_bytes=BROWSER_CACHE_MAX_MB * 1024 * 1024,
+                                         prune_interval=BROWSER_CACHE_PRUNE_INTERVAL)
+        browser_cache.start()
+    if STAGED_PAGES > 0 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        page_pool = StagedPagePool(size=STAGED_PAGES, ttl=STAGED_PAGE_TTL, disk_cache=browser_cache,
+                                   max_browser_age=POOL_BROWSER_MAX_AGE)
+        page_pool.start()
+        # Close the pooled browsers on exit, including reloader restarts
+        atexit.register(page_pool.stop)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,264 @@
+# browser_cache.py
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chrome's simple cache stores each entry as <16 hex digit hash>_0, _1 and _s files
+ENTRY_FILE = re.compile(r'^([0-9a-f]{16})_(0|1|s)$')
+# Index files Chrome needs to open the cache, never evicted
+INDEX_FILES = {'index', os.path.join('index-dir', 'the-real-index')}
+# Per-browser list of entries, rebuilt by Chrome from the entry files when missing
+REAL_INDEX = os.path.join('index-dir', 'the-real-index')
+
+def pid_alive(pid):
+    """Check whether a process with this pid is still running"""
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows, ask for a handle instead
+        import ctypes
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class BrowserDiskCache:
+    """Shared on-disk HTTP cache reused by every Chrome the scraper launches.
+
+    Chrome locks its cache directory and writes entries in place, so instances
+    can't point at (or hardlink) the same one. Instead each browser gets its
+    own writable profile whose cache is copied from the shared cache at launch,
+    and entries it wrote or read are merged back when the browser closes.
+    Each browser's entry index (index-dir/the-real-index) only lists its own
+    entries, so it is neither merged back nor seeded; Chrome rebuilds the
+    index of a new profile by scanning the entry files it was seeded with.
+    Call start() to prune the shared cache back under max_bytes every
+    prune_interval seconds, least recently used entries first.
+    """
+
+    def __init__(self, root="browser_cache", max_bytes=200 * 1024 * 1024, prune_interval=600):
+        self.root = os.path.abspath(root)
+        self.shared_dir = os.path.join(self.root, "shared")
+        # Profiles live under a per-process directory so other processes sharing root leave them alone
+        self.profiles_dir = os.path.join(self.root, "profiles", str(os.getpid()))
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        # Launches copy the shared cache concurrently, merges and prunes wait for them to finish
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Seconds spent copying the shared cache for the most recent launch
+        self.last_seed_seconds = None
+        os.makedirs(self.shared_dir, exist_ok=True)
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        self.cleanup_profiles()
+
+    def cleanup_profiles(self):
+        """Remove profiles left behind by processes that have exited"""
+        parent = os.path.dirname(self.profiles_dir)
+        for name in os.listdir(parent):
+            if name.isdigit() and int(name) != os.getpid() and not pid_alive(int(name)):
+                logger.info(f"Removing browser profiles of exited process {name}")
+                shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+
+    def start(self):
+        """Start pruning the shared cache in the background"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.prune_loop, name="browser-cache-prune", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the prune loop"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def prune_loop(self):
+        while not self.stop_event.wait(self.prune_interval):
+            try:
+                self.prune()
+            except Exception as e:
+                logger.error(f"Failed to prune browser cache: {e}")
+
+    def begin_read(self):
+        with self.condition:
+            # Waiting writers go first so a steady stream of launches can't starve them
+            while self.writing or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def end_read(self):
+        with self.condition:
+            self.readers -= 1
+            self.condition.notify_all()
+
+    def begin_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writing or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writing = True
+
+    def end_write(self):
+        with self.condition:
+            self.writing = False
+            self.condition.notify_all()
+
+    def create_profile(self):
+        """Create a private profile directory seeded with the shared cache.
+
+        Returns (profile_dir, cache_dir) for --user-data-dir and --disk-cache-dir.
+        """
+        profile_dir = os.path.join(self.profiles_dir, uuid.uuid4().hex)
+        cache_dir = os.path.join(profile_dir, "cache")
+        started = time.time()
+        self.begin_read()
+        try:
+            # Copies run alongside other launches, only merges and prunes are held off
+            shutil.copytree(self.shared_dir, cache_dir, copy_function=shutil.copyfile,
+                            ignore=self.ignore_real_index)
+        finally:
+            self.end_read()
+        # Stamp every seeded file with the seed time, so anything Chrome reads
+        # (atime) or writes (mtime) afterwards shows up as used when merging
+        seeded_at = time.time()
+        for dirpath, dirnames, filenames in os.walk(cache_dir):
+            for filename in filenames:
+                os.utime(os.path.join(dirpath, filename), (seeded_at, seeded_at))
+        with open(os.path.join(profile_dir, "seeded_at"), "w") as f:
+            f.write(repr(seeded_at))
+        self.last_seed_seconds = seeded_at - started
+        logger.info(f"Created browser profile {profile_dir} in {self.last_seed_seconds:.2f}s")
+        return profile_dir, cache_dir
+
+    def ignore_real_index(self, directory, names):
+        """copytree ignore hook that leaves out the entry index"""
+        if os.path.relpath(directory, self.shared_dir) == os.path.dirname(REAL_INDEX):
+            return [name for name in names if name == os.path.basename(REAL_INDEX)]
+        return []
+
+    def release_profile(self, profile_dir):
+        """Merge the profile's cache back into the shared cache and delete the profile"""
+        cache_dir = os.path.join(profile_dir, "cache")
+        try:
+            if os.path.isdir(cache_dir):
+                with open(os.path.join(profile_dir, "seeded_at")) as f:
+                    seeded_at = float(f.read())
+                self.merge(cache_dir, seeded_at)
+        except Exception as e:
+            logger.warning(f"Failed to merge browser cache: {e}")
+        finally:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def merge(self, cache_dir, seeded_at):
+        """Copy files written since seeding into the shared cache and mark used entries.
+
+        Shared files keep their mtime as the entry's last use, which is what
+        prune() evicts by.
+        """
+        written = []
+        used = set()
+        for dirpath, dirnames, filenames in os.walk(cache_dir):
+            for filename in filenames:
+                source = os.path.join(dirpath, filename)
+                relpath = os.path.relpath(source, cache_dir)
+                if relpath == REAL_INDEX:
+                    # Only lists this browser's entries, would hide everyone else's
+                    continue
+                stat = os.stat(source)
+                if stat.st_mtime > seeded_at:
+                    written.append(relpath)
+                elif stat.st_atime > seeded_at:
+                    used.add(relpath)
+
+        now = time.time()
+        self.begin_write()
+        try:
+            for relpath in written:
+                target = os.path.join(self.shared_dir, relpath)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(os.path.join(cache_dir, relpath), target)
+                os.utime(target, (now, now))
+            for relpath in used:
+                target = os.path.join(self.shared_dir, relpath)
+                if os.path.exists(target):
+                    os.utime(target, (now, now))
+        finally:
+            self.end_write()
+        logger.info(f"Merged {len(written)} new and {len(used)} used files into shared browser cache")
+
+    def entries(self):
+        """Group the shared cache into entries.
+
+        Returns (entries, other_bytes) where entries maps each entry hash to
+        (last_used, size, paths) and other_bytes is the size of index and
+        unrecognised files, which are never evicted.
+        """
+        entries = {}
+        other_bytes = 0
+        for dirpath, dirnames, filenames in os.walk(self.shared_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                match = ENTRY_FILE.match(filename)
+                if not match or os.path.relpath(path, self.shared_dir) in INDEX_FILES:
+                    other_bytes += stat.st_size
+                    continue
+                last_used, size, paths = entries.get(match.group(1), (0, 0, []))
+                entries[match.group(1)] = (max(last_used, stat.st_mtime), size + stat.st_size, paths + [path])
+        return entries, other_bytes
+
+    def size(self):
+        """Total size of the shared cache in bytes"""
+        entries, other_bytes = self.entries()
+        return other_bytes + sum(size for _, size, _ in entries.values())
+
+    def prune(self):
+        """Evict least recently used entries until the shared cache fits in max_bytes"""
+        self.begin_write()
+        try:
+            entries, other_bytes = self.entries()
+            total = other_bytes + sum(size for _, size, _ in entries.values())
+            if total <= self.max_bytes:
+                return 0
+
+            removed = 0
+            for last_used, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                # Remove every file of the entry so no half-deleted entries are left
+                for path in paths:
+                    os.remove(path)
+                total -= size
+                removed += 1
+            logger.info(f"Pruned {removed} entries from shared browser cache ({total} bytes left)")
+            return removed
+        finally:
+            self.end_write()
+
+    def clear(self):
+        """Empty the shared cache"""
+        self.begin_write()
+        try:
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
+            os.makedirs(self.shared_dir, exist_ok=True)
+        finally:
+            self.end_write()
@@ -0,0 +1,64 @@
+# cache_benchmark.py
+"""Compare first page load time and bytes transferred with the shared browser cache on and off.
+
+Usage: python cache_benchmark.py [runs]
+"""
+import sys
+import tempfile
+import time
+import logging
+from scraper import NagpurCourtScraper
+from browser_cache import BrowserDiskCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def first_load(disk_cache=None):
+    """Launch a browser, load the search page once and return its metrics.
+
+    launch_ms covers starting Chrome, including copying the shared cache
+    into the new profile when the cache is on.
+    """
+    started = time.time()
+    scraper = NagpurCourtScraper(disk_cache=disk_cache)
+    launch_ms = (time.time() - started) * 1000
+    try:
+        scraper.load_search_page()
+        metrics = scraper.first_load_metrics
+        if metrics:
+            metrics = dict(metrics, launch_ms=launch_ms,
+                           seed_ms=disk_cache.last_seed_seconds * 1000 if disk_cache else 0)
+        return metrics
+    finally:
+        scraper.close()
+
+def summarize(label, samples):
+    samples = [s for s in samples if s]
+    if not samples:
+        print(f"{label}: no successful loads")
+        return
+    load_times = [s['load_time_ms'] for s in samples if s['load_time_ms'] is not None]
+    transferred = [s['transfer_bytes'] for s in samples]
+    avg_load = sum(load_times) / len(load_times) if load_times else 0
+    avg_launch = sum(s['launch_ms'] for s in samples) / len(samples)
+    avg_seed = sum(s['seed_ms'] for s in samples) / len(samples)
+    print(f"{label}: {len(samples)} loads, "
+          f"avg launch {avg_launch:.0f} ms (cache copy {avg_seed:.0f} ms), "
+          f"avg load {avg_load:.0f} ms, "
+          f"avg launch + load {avg_launch + avg_load:.0f} ms, "
+          f"avg transferred {sum(transferred) / len(transferred) / 1024:.1f} KiB, "
+          f"cached resources {[s['cached_resources'] for s in samples]}")
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    without_cache = [first_load() for _ in range(runs)]
+
+    with tempfile.TemporaryDirectory() as cache_root:
+        disk_cache = BrowserDiskCache(cache_root)
+        # Warm the shared cache once, then measure browsers that start from it
+        first_load(disk_cache)
+        with_cache = [first_load(disk_cache) for _ in range(runs)]
+
+    summarize("Cache off", without_cache)
+    summarize("Cache on ", with_cache)
@@ -0,0 +1,315 @@
+# db_maintenance.py
+"""Retention, archival and compaction for database.db.
+
+Usage:
+    python db_maintenance.py sizes
+    python db_maintenance.py run [--max-age-days N] [--max-per-case N]
+    python db_maintenance.py vacuum
+    python db_maintenance.py export [-o FILE] [--no-archive]
+"""
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import sys
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'database.db'
+ARCHIVE_DIR = 'archive'
+
+QUERY_COLUMNS = ['id', 'case_type', 'case_number', 'filing_year', 'response', 'timestamp']
+
+# Rows archived per segment file, kept under SQLite's default 999 bound parameter limit
+SEGMENT_ROWS = 900
+
+def enable_incremental_vacuum(conn):
+    """Switch the database to incremental auto-vacuum.
+
+    Changing the auto_vacuum mode of an existing database only takes effect
+    after a full VACUUM, so that is done once here.
+    """
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    if mode != 2:
+        logger.info("Enabling incremental auto-vacuum on database")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+def migrate_queries_table(conn):
+    """Bring older queries tables up to date and add the indexes retention relies on"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(queries)")]
+    if not columns:
+        # No queries table yet, init_db() creates it with the current schema
+        return
+    if 'timestamp' not in columns:
+        # ALTER TABLE can't add a CURRENT_TIMESTAMP default, so backfill existing rows instead
+        conn.execute("ALTER TABLE queries ADD COLUMN timestamp DATETIME")
+        conn.execute("UPDATE queries SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_queries_timestamp ON queries (timestamp)")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_queries_case
+                    ON queries (case_type, case_number, filing_year, timestamp)""")
+    conn.commit()
+
+def find_expired(conn, max_age_days=None, max_per_case=None):
+    """Return ids of rows that fall outside the retention policy"""
+    conditions = []
+    params = []
+    if max_age_days:
+        conditions.append("timestamp < datetime('now', ?)")
+        params.append(f"-{int(max_age_days)} days")
+    if max_per_case:
+        # Keep only the newest max_per_case rows for each case key
+        conditions.append("""id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY case_type, case_number, filing_year
+                    ORDER BY timestamp DESC, id DESC
+                ) AS rank
+                FROM queries
+            ) WHERE rank > ?
+        )""")
+        params.append(int(max_per_case))
+    if not conditions:
+        return []
+    rows = conn.execute(f"SELECT id FROM queries WHERE {' OR '.join(conditions)} ORDER BY id", params)
+    return [row[0] for row in rows]
+
+def write_segment(rows, archive_dir=ARCHIVE_DIR):
+    """Write rows to a gzip-compressed NDJSON segment file and return its path.
+
+    The file is written under a temporary name and renamed once complete, so
+    readers never see a partial segment. Segments are named by their id range
+    only, so re-archiving the same rows after an interrupted run overwrites
+    the earlier segment instead of adding a duplicate.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    name = f"queries-{rows[0][0]:012d}-{rows[-1][0]:012d}.ndjson.gz"
+    path = os.path.join(archive_dir, name)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(QUERY_COLUMNS, row))) + '\n')
+    os.replace(tmp_path, path)
+    return path
+
+def apply_retention(db_path=DB_PATH, archive_dir=ARCHIVE_DIR, max_age_days=None, max_per_case=None):
+    """Archive expired rows to segment files, then delete them from the database.
+
+    Returns the number of rows archived.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        expired = find_expired(conn, max_age_days, max_per_case)
+        archived = 0
+        for start in range(0, len(expired), SEGMENT_ROWS):
+            ids = expired[start:start + SEGMENT_ROWS]
+            placeholders = ','.join('?' * len(ids))
+            rows = conn.execute(
+                f"SELECT {', '.join(QUERY_COLUMNS)} FROM queries WHERE id IN ({placeholders}) ORDER BY id",
+                ids).fetchall()
+            if not rows:
+                continue
+            # Only delete once the segment is safely on disk
+            path = write_segment(rows, archive_dir)
+            conn.execute(f"DELETE FROM queries WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            archived += len(rows)
+            logger.info(f"Archived {len(rows)} rows to {path}")
+        return archived
+    finally:
+        conn.close()
+
+def incremental_vacuum(db_path=DB_PATH, pages=None):
+    """Release free pages back to the filesystem, at most `pages` at a time"""
+    conn = sqlite3.connect(db_path)
+    try:
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        pragma = f"PRAGMA incremental_vacuum({int(pages)})" if pages else "PRAGMA incremental_vacuum"
+        # The pragma frees one page per step and execute() only steps it once,
+        # executescript() runs it to completion
+        conn.executescript(pragma)
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        logger.info(f"Incremental vacuum released {free_before - free_after} pages")
+        return free_before - free_after
+    finally:
+        conn.close()
+
+def table_sizes(db_path=DB_PATH):
+    """Return (name, type, rows, bytes) for every table and index in the database"""
+    conn = sqlite3.connect(db_path)
+    try:
+        objects = conn.execute(
+            "SELECT name, type, tbl_name FROM sqlite_master WHERE type IN ('table', 'index') ORDER BY tbl_name, type DESC, name"
+        ).fetchall()
+        try:
+            sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))
+        except sqlite3.OperationalError:
+            # SQLite was built without the dbstat virtual table
+            sizes = {}
+        report = []
+        for name, obj_type, table in objects:
+            rows = None
+            if obj_type == 'table':
+                rows = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+            report.append((name, obj_type, rows, sizes.get(name)))
+        return report
+    finally:
+        conn.close()
+
+def iter_archived_rows(archive_dir=ARCHIVE_DIR):
+    """Yield rows from every archived segment, each id once.
+
+    Segments are read in name order, which is not overall id order: a later
+    per-case retention pass can archive ids below an earlier segment's range.
+    An interrupted run can also archive the same row into two segments with
+    different ranges, so rows already seen are skipped.
+    """
+    if not os.path.isdir(archive_dir):
+        return
+    seen = set()
+    for name in sorted(os.listdir(archive_dir)):
+        if not name.endswith('.ndjson.gz'):
+            continue
+        with gzip.open(os.path.join(archive_dir, name), 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                if row['id'] in seen:
+                    continue
+                seen.add(row['id'])
+                yield row
+
+def export_queries(db_path=DB_PATH, archive_dir=ARCHIVE_DIR, include_archive=True):
+    """Yield every query as a dict, archived rows first, then rows still in the database.
+
+    Live rows are streamed from the database rather than loaded up front.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if include_archive:
+            # A row can be in both places if deletion failed after archiving, keep the live copy
+            live_ids = set(row[0] for row in conn.execute("SELECT id FROM queries"))
+            for row in iter_archived_rows(archive_dir):
+                if row['id'] not in live_ids:
+                    yield row
+            live_ids = None
+
+        for row in conn.execute(f"SELECT {', '.join(QUERY_COLUMNS)} FROM queries ORDER BY id"):
+            yield dict(zip(QUERY_COLUMNS, row))
+    finally:
+        conn.close()
+
+def run_maintenance(db_path=DB_PATH, archive_dir=ARCHIVE_DIR, max_age_days=None, max_per_case=None, vacuum_pages=None):
+    """Apply retention, then compact the database"""
+    archived = apply_retention(db_path, archive_dir, max_age_days, max_per_case)
+    released = incremental_vacuum(db_path, vacuum_pages)
+    return archived, released
+
+class MaintenanceTask:
+    """Background thread that periodically runs retention and incremental vacuum"""
+
+    def __init__(self, db_path=DB_PATH, archive_dir=ARCHIVE_DIR, max_age_days=None, max_per_case=None,
+                 interval=3600, vacuum_pages=None):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.max_age_days = max_age_days
+        self.max_per_case = max_per_case
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start the maintenance loop"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, name="db-maintenance", daemon=True)
+        self.thread.start()
+        logger.info(f"Database maintenance started (every {self.interval}s)")
+
+    def stop(self):
+        """Stop the maintenance loop"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def loop(self):
+        while not self.stop_event.is_set():
+            try:
+                run_maintenance(self.db_path, self.archive_dir, self.max_age_days,
+                                self.max_per_case, self.vacuum_pages)
+            except Exception as e:
+                logger.error(f"Database maintenance failed: {e}")
+            self.stop_event.wait(self.interval)
+
+def format_bytes(size):
+    if size is None:
+        return 'n/a'
+    for unit in ['B', 'KiB', 'MiB']:
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the query history database")
+    parser.add_argument('--db', default=DB_PATH, help="Path to the SQLite database")
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help="Directory for archived segments")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('sizes', help="Report table and index sizes")
+
+    run_parser = subparsers.add_parser('run', help="Archive expired rows and vacuum")
+    run_parser.add_argument('--max-age-days', type=int, help="Archive rows older than this many days")
+    run_parser.add_argument('--max-per-case', type=int, help="Keep only this many rows per case")
+
+    vacuum_parser = subparsers.add_parser('vacuum', help="Run an incremental vacuum")
+    vacuum_parser.add_argument('--pages', type=int, help="Maximum number of pages to release")
+
+    export_parser = subparsers.add_parser('export', help="Export queries as NDJSON")
+    export_parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    export_parser.add_argument('--no-archive', action='store_true', help="Skip archived segments")
+
+    args = parser.parse_args(argv)
+
+    # The CLI may run before the app has ever started against this database
+    conn = sqlite3.connect(args.db)
+    try:
+        migrate_queries_table(conn)
+        enable_incremental_vacuum(conn)
+    finally:
+        conn.close()
+
+    if args.command == 'sizes':
+        conn = sqlite3.connect(args.db)
+        page_size, page_count, freelist = [
+            conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+            for pragma in ('page_size', 'page_count', 'freelist_count')
+        ]
+        conn.close()
+        print(f"{'name':<32} {'type':<6} {'rows':>10} {'size':>12}")
+        for name, obj_type, rows, size in table_sizes(args.db):
+            print(f"{name:<32} {obj_type:<6} {'' if rows is None else rows:>10} {format_bytes(size):>12}")
+        print(f"\nFile: {format_bytes(page_size * page_count)}, free pages: {freelist} ({format_bytes(page_size * freelist)})")
+    elif args.command == 'run':
+        archived, released = run_maintenance(args.db, args.archive_dir, args.max_age_days, args.max_per_case)
+        print(f"Archived {archived} rows, released {released} pages")
+    elif args.command == 'vacuum':
+        print(f"Released {incremental_vacuum(args.db, args.pages)} pages")
+    elif args.command == 'export':
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for row in export_queries(args.db, args.archive_dir, include_archive=not args.no_archive):
+                out.write(json.dumps(row) + '\n')
+        finally:
+            if args.output:
+                out.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
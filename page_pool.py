@@ -0,0 +1,219 @@
+# page_pool.py
+import threading
+import time
+import logging
+from scraper import NagpurCourtScraper
+
+logger = logging.getLogger(__name__)
+
+class StagedPagePool:
+    """Keeps idle scrapers parked on the search page, ready for a lookup.
+
+    A background thread keeps `size` drivers staged with the court complex
+    selected and the case type list loaded. Pages older than `ttl` seconds are
+    reloaded before they are handed out, since the site session and captcha
+    have most likely expired by then. Pass a BrowserDiskCache as disk_cache
+    to have every pooled browser reuse the shared HTTP cache; browsers older
+    than max_browser_age seconds are then closed and replaced instead of being
+    restaged, so their cache gets merged back into the shared one.
+    """
+
+    def __init__(self, size=2, ttl=300, interval=5, disk_cache=None, max_browser_age=3600):
+        self.size = size
+        self.disk_cache = disk_cache
+        self.max_browser_age = max_browser_age
+        self.ttl = ttl
+        self.interval = interval
+        self.idle = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        # Background restage threads started by acquire() and release(), joined on stop()
+        self.restage_threads = set()
+        # Number of scrapers alive (idle, being staged or lent out)
+        self.total = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.recycled = 0
+        self.staging_failures = 0
+        self.hit_ages = []
+
+    def start(self):
+        """Start the background staging loop"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.staging_loop, name="page-pool", daemon=True)
+        self.thread.start()
+        logger.info(f"Staged page pool started (size={self.size}, ttl={self.ttl}s)")
+
+    def stop(self):
+        """Stop the staging loop and close every idle browser"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 30)
+        with self.lock:
+            restage_threads = list(self.restage_threads)
+        for thread in restage_threads:
+            thread.join(timeout=60)
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.total -= len(idle)
+        for scraper in idle:
+            self.close_scraper(scraper)
+        logger.info("Staged page pool stopped")
+
+    def staging_loop(self):
+        """Refresh stale pages and top the pool back up to its configured size"""
+        while not self.stop_event.is_set():
+            try:
+                self.refresh_stale()
+                self.fill()
+            except Exception as e:
+                logger.error(f"Page pool staging error: {e}")
+            self.stop_event.wait(self.interval)
+
+    def is_fresh(self, scraper):
+        return scraper.staged_at is not None and time.time() - scraper.staged_at < self.ttl
+
+    def refresh_stale(self):
+        """Reload idle pages whose TTL has run out and recycle old browsers"""
+        with self.lock:
+            stale = [s for s in self.idle if not self.is_fresh(s) or self.should_recycle(s)]
+            self.idle = [s for s in self.idle if s not in stale]
+        for scraper in stale:
+            with self.lock:
+                self.reloads += 1
+            logger.info("Reloading stale staged page")
+            self.restage(scraper)
+
+    def fill(self):
+        """Launch and stage new browsers until the pool is full"""
+        while not self.stop_event.is_set():
+            with self.lock:
+                if self.total >= self.size:
+                    return
+                self.total += 1
+            try:
+                scraper = NagpurCourtScraper(disk_cache=self.disk_cache)
+            except Exception as e:
+                logger.error(f"Failed to launch browser for page pool: {e}")
+                with self.lock:
+                    self.total -= 1
+                    self.staging_failures += 1
+                return
+            if not self.restage(scraper):
+                return
+
+    def should_recycle(self, scraper):
+        return bool(self.max_browser_age) and time.time() - scraper.started_at >= self.max_browser_age
+
+    def restage(self, scraper):
+        """Stage the scraper and park it in the idle list, closing it on failure.
+
+        Browsers past max_browser_age are closed instead; the staging loop
+        launches a replacement.
+        """
+        if self.should_recycle(scraper):
+            logger.info("Recycling pooled browser")
+            with self.lock:
+                self.recycled += 1
+                self.total -= 1
+            self.close_scraper(scraper)
+            return False
+        if scraper.stage_search_page():
+            with self.lock:
+                # stop() may have already emptied the idle list, don't park a browser nobody will close
+                if not self.stop_event.is_set():
+                    self.idle.append(scraper)
+                    return True
+                self.total -= 1
+            self.close_scraper(scraper)
+            return False
+        with self.lock:
+            self.staging_failures += 1
+            self.total -= 1
+        self.close_scraper(scraper)
+        return False
+
+    def acquire(self):
+        """Take a staged scraper from the pool.
+
+        Returns (scraper, staged). On a miss a fresh, unstaged scraper is
+        launched and staged is False, so the caller has to do the full page load.
+        """
+        with self.lock:
+            while self.idle:
+                scraper = self.idle.pop(0)
+                if self.is_fresh(scraper):
+                    self.hits += 1
+                    self.hit_ages.append(time.time() - scraper.staged_at)
+                    # Only keep recent samples for the age report
+                    self.hit_ages = self.hit_ages[-100:]
+                    return scraper, True
+                # Expired while waiting, reload it in the background
+                self.start_restage(self.restage_stale, scraper)
+            self.misses += 1
+        return NagpurCourtScraper(disk_cache=self.disk_cache), False
+
+    def restage_stale(self, scraper):
+        with self.lock:
+            self.reloads += 1
+        self.restage(scraper)
+
+    def release(self, scraper, staged):
+        """Hand a scraper back after a lookup.
+
+        Pooled scrapers are restaged in the background so the browser gets
+        reused; scrapers created on a miss are simply closed.
+        """
+        if not staged or self.stop_event.is_set():
+            if staged:
+                with self.lock:
+                    self.total -= 1
+            self.close_scraper(scraper)
+            return
+        with self.lock:
+            self.start_restage(self.restage, scraper)
+
+    def start_restage(self, target, scraper):
+        """Run target(scraper) in a tracked background thread, caller holds the lock"""
+        def run():
+            try:
+                target(scraper)
+            finally:
+                with self.lock:
+                    self.restage_threads.discard(thread)
+        thread = threading.Thread(target=run, daemon=True)
+        self.restage_threads.add(thread)
+        thread.start()
+
+    def close_scraper(self, scraper):
+        try:
+            scraper.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled browser: {e}")
+
+    def stats(self):
+        """Report staged page hit rate and age"""
+        with self.lock:
+            now = time.time()
+            idle_ages = [now - s.staged_at for s in self.idle if s.staged_at is not None]
+            hit_ages = list(self.hit_ages)
+            lookups = self.hits + self.misses
+            return {
+                'size': self.size,
+                'ttl': self.ttl,
+                'idle': len(self.idle),
+                'total': self.total,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'reloads': self.reloads,
+                'recycled': self.recycled,
+                'staging_failures': self.staging_failures,
+                'avg_hit_age': round(sum(hit_ages) / len(hit_ages), 1) if hit_ages else None,
+                'max_hit_age': round(max(hit_ages), 1) if hit_ages else None,
+                'idle_ages': [round(age, 1) for age in idle_ages],
+            }
@@ -30,10 +30,18 @@ if os.name == 'nt':  # Windows
         pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
 class NagpurCourtScraper:
-    def __init__(self, enable_manual_captcha=False):
+    def __init__(self, enable_manual_captcha=False, disk_cache=None):
         self.base_url = "https://nagpur.dcourts.gov.in/court-orders-search-by-case-number/"
         self.driver = None
         self.enable_manual_captcha = enable_manual_captcha
+        # Optional BrowserDiskCache shared between browser instances
+        self.disk_cache = disk_cache
+        self.profile_dir = None
+        # Timing and transfer size of the first page load in this browser
+        self.first_load_metrics = None
+        self.started_at = time.time()
+        # Time the search page was last staged, None when not parked on the form
+        self.staged_at = None
         self.setup_driver()
     
     def setup_driver(self):
@@ -46,14 +54,63 @@ class NagpurCourtScraper:
         # Uncomment the line below to run in headless mode
         # chrome_options.add_argument("--headless")
         
+        if self.disk_cache:
+            # Private profile seeded from the shared cache, so instances don't lock each other out
+            self.profile_dir, cache_dir = self.disk_cache.create_profile()
+            chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
+            chrome_options.add_argument(f"--disk-cache-dir={cache_dir}")
+            chrome_options.add_argument(f"--disk-cache-size={self.disk_cache.max_bytes}")
+        
         try:
             service = Service(ChromeDriverManager().install())
             self.driver = webdriver.Chrome(service=service, options=chrome_options)
             logger.info("Chrome driver setup successful")
         except Exception as e:
             logger.error(f"Failed to setup Chrome driver: {e}")
+            if self.profile_dir:
+                self.disk_cache.release_profile(self.profile_dir)
+                self.profile_dir = None
             raise
     
+    def load_search_page(self, timeout=15):
+        """Navigate to the search page and wait for the form to load"""
+        self.driver.get(self.base_url)
+        WebDriverWait(self.driver, timeout).until(
+            EC.presence_of_element_located((By.ID, "est_code"))
+        )
+        if self.first_load_metrics is None:
+            self.first_load_metrics = self.measure_page_load()
+            logger.info(f"First page load: {self.first_load_metrics}")
+    
+    def measure_page_load(self):
+        """Measure load time and bytes transferred for the current page.
+        
+        Uses the Navigation and Resource Timing APIs; resources served from
+        the disk cache report a transferSize of 0.
+        """
+        try:
+            return self.driver.execute_script("""
+                var nav = performance.getEntriesByType('navigation')[0];
+                var resources = performance.getEntriesByType('resource');
+                var transferred = nav ? nav.transferSize : 0;
+                var cached = 0;
+                for (var i = 0; i < resources.length; i++) {
+                    transferred += resources[i].transferSize;
+                    if (resources[i].transferSize === 0 && resources[i].decodedBodySize > 0) {
+                        cached++;
+                    }
+                }
+                return {
+                    load_time_ms: nav ? Math.round(nav.domContentLoadedEventEnd - nav.startTime) : null,
+                    transfer_bytes: transferred,
+                    resources: resources.length,
+                    cached_resources: cached
+                };
+            """)
+        except Exception as e:
+            logger.warning(f"Failed to measure page load: {e}")
+            return None
+    
     def solve_captcha(self, captcha_element):
         """Solve captcha using OCR with improved preprocessing"""
         try:
@@ -170,8 +227,8 @@ class NagpurCourtScraper:
             logger.error(f"Failed to find form fields: {e}")
             return None
     
-    def fill_form_fields(self, case_type, case_number, filing_year):
-        """Fill form fields with provided data"""
+    def select_court_complex(self):
+        """Select the court complex and wait for the dynamic case type list to load"""
         try:
             form_fields = self.find_form_fields()
             if not form_fields:
@@ -203,6 +260,39 @@ class NagpurCourtScraper:
                 # Wait for case type dropdown to be populated (it's dynamic)
                 time.sleep(5)
             
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to select court complex: {e}")
+            return False
+    
+    def stage_search_page(self):
+        """Load the search page and select the court complex ahead of a lookup.
+        
+        Leaves the driver parked on the search form with the case type list
+        loaded, so a later lookup can start straight at fill_case_fields().
+        """
+        try:
+            self.staged_at = None
+            self.load_search_page()
+            if not self.select_court_complex():
+                return False
+            
+            # Make sure the case type list has actually been populated
+            WebDriverWait(self.driver, 10).until(
+                lambda d: len(Select(d.find_element(By.ID, "case_type")).options) > 1
+            )
+            self.staged_at = time.time()
+            logger.info("Search page staged")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to stage search page: {e}")
+            return False
+    
+    def fill_case_fields(self, case_type, case_number, filing_year):
+        """Fill case type, number and year on a page whose court complex is already selected"""
+        try:
             # Now fill the case type (it should be enabled now)
             case_type_select = self.driver.find_element(By.ID, "case_type")
             if case_type_select and not case_type_select.get_attribute("disabled"):
@@ -260,6 +350,14 @@ class NagpurCourtScraper:
             logger.error(f"Failed to fill form fields: {e}")
             return False
     
+    def fill_form_fields(self, case_type, case_number, filing_year):
+        """Fill form fields with provided data"""
+        # The page is no longer in its staged state once we start typing into it
+        self.staged_at = None
+        if not self.select_court_complex():
+            return False
+        return self.fill_case_fields(case_type, case_number, filing_year)
+    
     def save_captcha_image(self, captcha_element, filename="captcha.png"):
         """Save captcha image for manual review"""
         try:
@@ -488,8 +586,12 @@ class NagpurCourtScraper:
             logger.error(f"Failed to extract results: {e}")
             return {'error': str(e)}
     
-    def scrape_case_data(self, case_type, case_number, filing_year):
-        """Main method to scrape case data"""
+    def scrape_case_data(self, case_type, case_number, filing_year, staged=False):
+        """Main method to scrape case data
+        
+        Pass staged=True when the driver was prepared with stage_search_page();
+        the lookup then starts at the field-fill step.
+        """
         try:
             logger.info(f"Starting scrape for case: {case_type}/{case_number}/{filing_year}")
             
@@ -498,19 +600,19 @@ class NagpurCourtScraper:
             self.last_case_number = case_number
             self.last_filing_year = filing_year
             
-            # Navigate to the website
-            self.driver.get(self.base_url)
-            logger.info("Navigated to website")
-            
-            # Wait for page to load completely
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.ID, "est_code"))
-            )
-            logger.info("Page loaded successfully")
-            
-            # Fill form fields
-            if not self.fill_form_fields(case_type, case_number, filing_year):
-                raise Exception("Failed to fill form fields")
+            if staged:
+                # Court complex is already selected, go straight to the case fields
+                self.staged_at = None
+                if not self.fill_case_fields(case_type, case_number, filing_year):
+                    raise Exception("Failed to fill form fields")
+            else:
+                # Navigate to the website and wait for page to load completely
+                self.load_search_page()
+                logger.info("Page loaded successfully")
+                
+                # Fill form fields
+                if not self.fill_form_fields(case_type, case_number, filing_year):
+                    raise Exception("Failed to fill form fields")
             
             # Handle captcha (now includes retry mechanism)
             if not self.handle_captcha():
@@ -534,6 +636,10 @@ class NagpurCourtScraper:
         if self.driver:
             self.driver.quit()
             logger.info("Browser closed")
+        if self.profile_dir:
+            # Hand newly cached files back to the shared cache
+            self.disk_cache.release_profile(self.profile_dir)
+            self.profile_dir = None
 
 # Legacy function for backward compatibility
 def scrape_case_data(case_type, case_number, filing_year):
@@ -0,0 +1,146 @@
+# tests/test_db_maintenance.py
+import gzip
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_maintenance
+from db_maintenance import (QUERY_COLUMNS, apply_retention, export_queries, find_expired,
+                            iter_archived_rows, migrate_queries_table, write_segment)
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'database.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    case_type TEXT,
+                    case_number TEXT,
+                    filing_year TEXT,
+                    response TEXT,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )''')
+    conn.commit()
+    conn.close()
+    return path
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    return str(tmp_path / 'archive')
+
+def insert(db_path, case_number, days_ago=0, case_type='Criminal', filing_year='2023'):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.execute(
+        "INSERT INTO queries (case_type, case_number, filing_year, response, timestamp) "
+        "VALUES (?, ?, ?, 'result', datetime('now', ?))",
+        (case_type, case_number, filing_year, f"-{days_ago} days"))
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+def live_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM queries ORDER BY id")]
+    conn.close()
+    return ids
+
+def select_rows(db_path, ids):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        f"SELECT {', '.join(QUERY_COLUMNS)} FROM queries WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id",
+        ids).fetchall()
+    conn.close()
+    return rows
+
+def test_find_expired_by_age(db_path):
+    old = insert(db_path, '1', days_ago=400)
+    insert(db_path, '2', days_ago=10)
+    conn = sqlite3.connect(db_path)
+    assert find_expired(conn, max_age_days=365) == [old]
+    conn.close()
+
+def test_find_expired_keeps_newest_per_case(db_path):
+    oldest = insert(db_path, '1', days_ago=3)
+    older = insert(db_path, '1', days_ago=2)
+    insert(db_path, '1', days_ago=1)
+    insert(db_path, '1', days_ago=0)
+    other_case = insert(db_path, '2', days_ago=5)
+    conn = sqlite3.connect(db_path)
+    assert find_expired(conn, max_per_case=2) == [oldest, older]
+    # Age and count rules are combined
+    assert find_expired(conn, max_age_days=4, max_per_case=2) == [oldest, older, other_case]
+    assert find_expired(conn) == []
+    conn.close()
+
+def test_apply_retention_archives_before_deleting(db_path, archive_dir, monkeypatch):
+    old = insert(db_path, '1', days_ago=400)
+    kept = insert(db_path, '2')
+
+    def failing_write_segment(rows, archive_dir):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(db_maintenance, 'write_segment', failing_write_segment)
+    with pytest.raises(OSError):
+        apply_retention(db_path, archive_dir, max_age_days=365)
+    # Nothing is deleted when the segment could not be written
+    assert live_ids(db_path) == [old, kept]
+
+    monkeypatch.undo()
+    assert apply_retention(db_path, archive_dir, max_age_days=365) == 1
+    assert live_ids(db_path) == [kept]
+    assert [row['id'] for row in iter_archived_rows(archive_dir)] == [old]
+
+def test_segment_is_gzip_ndjson(db_path, archive_dir):
+    row_id = insert(db_path, '1')
+    path = write_segment(select_rows(db_path, [row_id]), archive_dir)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 1
+    assert rows[0]['id'] == row_id
+    assert rows[0]['case_number'] == '1'
+
+def test_rearchiving_same_range_overwrites_segment(db_path, archive_dir):
+    ids = [insert(db_path, '1'), insert(db_path, '2')]
+    rows = select_rows(db_path, ids)
+    first = write_segment(rows, archive_dir)
+    second = write_segment(rows, archive_dir)
+    assert first == second
+    assert os.listdir(archive_dir) == [os.path.basename(first)]
+
+def test_export_returns_each_id_once(db_path, archive_dir):
+    archived = insert(db_path, '1')
+    both = insert(db_path, '2')
+    live = insert(db_path, '3')
+    # Overlapping segments, as left by an interrupted run whose batch boundaries shifted
+    write_segment(select_rows(db_path, [archived, both]), archive_dir)
+    write_segment(select_rows(db_path, [both]), archive_dir)
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM queries WHERE id = ?", (archived,))
+    conn.commit()
+    conn.close()
+
+    ids = [row['id'] for row in export_queries(db_path, archive_dir)]
+    assert sorted(ids) == [archived, both, live]
+    assert [row['id'] for row in export_queries(db_path, archive_dir, include_archive=False)] == [both, live]
+
+def test_migrate_adds_timestamp_column(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE queries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    case_type TEXT,
+                    case_number TEXT,
+                    filing_year TEXT,
+                    response TEXT
+                )''')
+    conn.execute("INSERT INTO queries (case_type, case_number, filing_year, response) VALUES ('a', '1', '2023', 'r')")
+    conn.commit()
+    migrate_queries_table(conn)
+    assert conn.execute("SELECT timestamp FROM queries").fetchone()[0] is not None
+    assert find_expired(conn, max_per_case=1) == []
+    conn.close()